@@ -1,16 +1,16 @@
 import asyncio
+import os
 import platform
-import re
 import threading
-from queue import Queue
 import sys
 import pygame
 import pymunk
-import pymunk.pygame_util
 import random
 import time
 import argparse
+from bisect import bisect_right
 from collections import deque
+from functools import lru_cache
 
 # Configuration
 FPS = 60  # Frames per second for the game loop
@@ -32,6 +32,7 @@ FADE_START_Y = SCROLL_AREA_HEIGHT - (6 * MIN_LINE_SPACING)  # Y-coordinate where
 FADE_END_Y = SCROLL_AREA_HEIGHT  # Y-coordinate where fading ends (text becomes fully transparent)
 MAX_URL_LENGTH = 30  # Maximum length for displayed URLs
 SUBSTEPS = 5  # Number of physics substeps per frame for better collision detection
+PHYSICS_DT = 1.0 / FPS / SUBSTEPS  # Duration of a single physics substep in seconds
 WALL_THICKNESS = 10  # Thickness of the funnel walls (increased to prevent clipping)
 DESPAWN_TIME = 10  # Time in seconds after which objects are despawned if still on screen
 BALL_SPAWN_VX = -250  # Base horizontal spawn velocity for balls (negative for leftward motion)
@@ -39,6 +40,8 @@ BALL_SPAWN_VX_RANGE = (-200, 100)  # Randomization range for horizontal spawn ve
 
 # Function: format_size
 # Description: Converts a byte size into a human-readable format (e.g., B, KB, MB, GB, TB).
+# Results are cached since the same sizes are formatted frame after frame.
+@lru_cache(maxsize=4096)
 def format_size(size):
     units = ['B', 'KB', 'MB', 'GB', 'TB']
     unit_index = 0
@@ -63,8 +66,12 @@ class LogVisualizer:
         except pygame.error as e:
             print(f"Warning: Could not load icon 'funnel.png': {e}")
         
+        # Area left of the info panel, the only part of the screen cleared each frame
+        self.main_area_rect = pygame.Rect(0, 0, MAIN_AREA_WIDTH, SCREEN_HEIGHT)
         self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont("Arial", 14)
+        # Reuse rendered text surfaces for repeated (text, color) pairs
+        self.render_text = lru_cache(maxsize=1024)(self.render_text)
         
         # Initialize Pymunk for physics simulation
         self.space = pymunk.Space()
@@ -82,11 +89,24 @@ class LogVisualizer:
         self.space.add(self.left_wall, self.right_wall)
         
         # Initialize log queue and stats
-        self.log_queue = Queue()  # Queue to hold incoming log data
+        # Queue to hold incoming log data; deque append/popleft are atomic, which is enough
+        # for the single log thread producing and the main loop consuming
+        self.log_queue = deque()
         self.balls = []  # List to store active balls
         self.recent_urls = []  # List to store recent URLs (not limited)
-        self.url_positions = []  # List to store URL positions for scrolling
-        self.request_times = deque(maxlen=3600)  # Store timestamps of requests (last 1 hour)
+        # Display strings (URL, size) for the scrolling list, newest first; a row's y-position is derived from its index
+        self.url_positions = deque(maxlen=(SCROLL_AREA_HEIGHT - 20) // MIN_LINE_SPACING)
+        # Alpha of each URL row, precomputed since rows sit at fixed y-positions
+        self.row_alpha = []
+        for i in range(self.url_positions.maxlen):
+            y_pos = 20 + i * MIN_LINE_SPACING
+            alpha = 255
+            if y_pos >= FADE_START_Y:
+                # Linearly reduce alpha from 255 to 0 between FADE_START_Y and FADE_END_Y
+                alpha = int(255 * (1 - (y_pos - FADE_START_Y) / (FADE_END_Y - FADE_START_Y)))
+                alpha = max(0, min(255, alpha))
+            self.row_alpha.append(alpha)
+        self.request_times = []  # Time-ordered timestamps of requests (trimmed to the last minute)
         self.max_size_seen = 1000  # Track the largest request size seen
         self.max_size_url = ""  # Track the URL associated with the largest request size
         self.colors = [
@@ -99,29 +119,47 @@ class LogVisualizer:
         self.test_mode = test_mode  # Flag for test mode (simulated logs)
 
     # Function: extract_log_info
-    # Description: Extracts relevant information (method, URL, status, size) from a log line using regex.
+    # Description: Extracts relevant information (method, URL, status, size) from a raw (bytes) log line
+    # by locating the quoted request field and reading the status and size that follow it.
     def extract_log_info(self, line):
-        match = re.search(r'"(\S+) (\S+) \S+" (\d+) (\d+|-)', line)
-        if match:
-            method = match.group(1)
-            url = match.group(2)
-            status = int(match.group(3))
-            size_str = match.group(4)
+        try:
+            q1 = line.index(b'"')
+            q2 = line.index(b'"', q1 + 1)
+            # Apache escapes quotes inside the request as \", so skip those to find the closing quote
+            while line[q2 - 1] == 0x5c:
+                q2 = line.index(b'"', q2 + 1)
+            method, url, _ = line[q1 + 1:q2].split(b' ', 2)
+            tail = line[q2 + 1:].split(None, 2)
+            status = int(tail[0])
             # Convert size to 0 if it's a dash (indicating no size)
-            size = 0 if size_str == '-' else int(size_str)
-            # Remove query parameters from URL
-            url = url.split('?')[0]
-            return {'method': method, 'url': url, 'status': status, 'size': size}
-        return None
+            size = 0 if tail[1] == b'-' else int(tail[1])
+        except (ValueError, IndexError):
+            return None
+        # Remove query parameters from URL and decode only the fields we keep
+        url = url.partition(b'?')[0].decode('utf-8', 'replace')
+        return {'method': method.decode('ascii', 'replace'), 'url': url, 'status': status, 'size': size}
 
     # Function: tail_logs
-    # Description: Reads log lines from stdin (e.g., from a tail command) and adds them to the log queue.
+    # Description: Reads raw log data from stdin (e.g., from a tail command) in chunks, splits it into lines
+    # and adds the parsed entries to the log queue.
     def tail_logs(self):
-        for line in sys.stdin:
-            log_data = self.extract_log_info(line)
-            if log_data:
-                self.log_queue.put(log_data)
-                self.request_times.append(time.time())
+        fd = sys.stdin.fileno()
+        remainder = b''
+        while True:
+            # os.read returns whatever is available, so lines are handled as soon as they arrive
+            chunk = os.read(fd, 65536)
+            # Lines read together share one timestamp
+            now = time.monotonic()
+            lines = (remainder + chunk).split(b'\n')
+            # Keep the trailing partial line for the next chunk, or parse it as the last line at EOF
+            remainder = lines.pop() if chunk else b''
+            for line in lines:
+                log_data = self.extract_log_info(line)
+                if log_data:
+                    self.log_queue.append(log_data)
+                    self.request_times.append(now)
+            if not chunk:
+                break
 
     # Function: simulate_logs
     # Description: Simulates fake log requests in test mode (15 to 20 requests per second).
@@ -138,8 +176,14 @@ class LogVisualizer:
             status = random.choice(statuses)
             size = random.randint(0, 100000)
             log_data = {'method': method, 'url': url, 'status': status, 'size': size}
-            self.log_queue.put(log_data)
-            self.request_times.append(time.time())
+            self.log_queue.append(log_data)
+            self.request_times.append(time.monotonic())
+
+    # Function: render_text
+    # Description: Renders a line of text with the panel font, converted to the display's pixel format
+    # so blits skip the per-call conversion (cached per instance, see __init__).
+    def render_text(self, text, color):
+        return self.font.render(text, True, color).convert_alpha()
 
     # Function: draw_shape
     # Description: Draws a physics shape (circle, polygon, or segment) with a colored outline.
@@ -161,15 +205,21 @@ class LogVisualizer:
 
     class Ball:
         # Function: __init__
-        # Description: Initializes a new ball with properties based on the log data (method, status, size).
-        def __init__(self, visualizer, log_data):
+        # Description: Initializes a new ball with properties based on the log data (method, status, size),
+        # spawned at time `now` (time.monotonic() of the current frame).
+        def __init__(self, visualizer, log_data, now):
             self.url = log_data.get('url', '')
             self.status = log_data.get('status', 200)
             self.size = log_data.get('size', 0)
             self.method = log_data.get('method', 'GET')
-            self.color = random.choice(visualizer.colors)
-            # Record the spawn time for despawning logic
-            self.spawn_time = time.time()
+            # random.random is bound once and scaled by hand instead of going through
+            # random.choice/random.uniform, which add a Python-level call each
+            rand = random.random
+            colors = visualizer.colors
+            self.color = colors[int(rand() * len(colors))]
+            # Record the spawn time and the time after which the ball is despawned
+            self.spawn_time = now
+            self.despawn_at = self.spawn_time + DESPAWN_TIME
             
             # Define fixed radius based on size thresholds
             size_thresholds = [
@@ -249,10 +299,11 @@ class LogVisualizer:
                 self.shape = pymunk.Circle(self.body, self.radius)
             
             # Set the initial position in the top-right corner of the physics area
-            self.body.position = (MAIN_AREA_WIDTH - 20 - self.radius, random.uniform(20, 50))
+            self.body.position = (MAIN_AREA_WIDTH - 20 - self.radius, 20 + 30 * rand())
             # Set initial velocity using BALL_SPAWN_VX with randomization
-            vx = BALL_SPAWN_VX + random.uniform(BALL_SPAWN_VX_RANGE[0], BALL_SPAWN_VX_RANGE[1])
-            vy = random.uniform(-50, 50)
+            vx_min, vx_max = BALL_SPAWN_VX_RANGE
+            vx = BALL_SPAWN_VX + vx_min + (vx_max - vx_min) * rand()
+            vy = -50 + 100 * rand()
             self.body.velocity = (vx, vy)
             
             # Apply physical properties to the main shape
@@ -261,13 +312,21 @@ class LogVisualizer:
                 self.shape.friction = 0.5
                 self.shape.color = self.color + (255,)
             
-            # Add the shape to the physics space
+            # Keep the shapes attached to the body together for drawing and removal
             if self.method == 'POST':
-                visualizer.space.add(self.body, self.arrow_shape)
+                self.shapes = (self.arrow_shape,)
             elif self.method == 'DELETE':
-                visualizer.space.add(self.body, self.shape1, self.shape2)
+                self.shapes = (self.shape1, self.shape2)
             else:
-                visualizer.space.add(self.body, self.shape)
+                self.shapes = (self.shape,)
+            
+            # Add the body and its shapes to the physics space
+            visualizer.space.add(self.body, *self.shapes)
+            
+            # Render the status label once since it never changes, and keep its half-size for centering
+            self.status_surface = visualizer.render_text(str(self.status), visualizer.white)
+            self.status_half_width = self.status_surface.get_width() // 2
+            self.status_half_height = self.status_surface.get_height() // 2
             self.visualizer = visualizer
 
     # Function: run
@@ -281,8 +340,24 @@ class LogVisualizer:
         log_thread.daemon = True
         log_thread.start()
         
+        # Bind attributes and functions used on every frame to locals, which are faster to look up
+        screen = self.screen
+        blit = screen.blit
+        space = self.space
+        step = space.step
+        draw_shape = self.draw_shape
+        render_text = self.render_text
+        white = self.white
+        row_alpha = self.row_alpha
+        log_queue = self.log_queue
+        url_positions = self.url_positions
+        request_times = self.request_times
+        
         running = True
         while running:
+            # Read the clock once per frame; every timestamp uses time.monotonic()
+            now = time.monotonic()
+            
             # Handle Pygame events (e.g., quitting, key presses)
             for event in pygame.event.get():
                 if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
@@ -292,116 +367,89 @@ class LogVisualizer:
                     self.max_size_seen = 1000
                     self.max_size_url = ""
             
-            # Add new balls from the log queue
-            while not self.log_queue.empty() and len(self.balls) < MAX_BALLS:
-                log_data = self.log_queue.get()
-                self.balls.append(self.Ball(self, log_data))
+            # Add new balls from the log queue (the main loop is the only consumer, so a
+            # non-empty queue cannot be drained between the check and popleft)
+            balls = self.balls
+            while log_queue and len(balls) < MAX_BALLS:
+                log_data = log_queue.popleft()
+                balls.append(self.Ball(self, log_data, now))
+                url = log_data['url']
+                size = log_data['size']
                 # Update the largest request size seen and its associated URL
-                if log_data['size'] > self.max_size_seen:
-                    self.max_size_seen = log_data['size']
-                    self.max_size_url = log_data['url']
-                self.recent_urls.append((log_data['url'], log_data['size']))
-                # Shift all existing URLs downward
-                for i in range(len(self.url_positions)):
-                    url, size, y_pos = self.url_positions[i]
-                    y_pos += MIN_LINE_SPACING
-                    self.url_positions[i] = (url, size, y_pos)
-                # Remove URLs that have scrolled off the bottom
-                for i in range(len(self.url_positions) - 1, -1, -1):
-                    url, size, y_pos = self.url_positions[i]
-                    if y_pos >= SCROLL_AREA_HEIGHT:
-                        self.url_positions.pop(i)
-                # Add the new URL at the top
-                self.url_positions.append((log_data['url'], log_data['size'], 20))
+                if size > self.max_size_seen:
+                    self.max_size_seen = size
+                    self.max_size_url = url
+                self.recent_urls.append((url, size))
+                # Truncate the URL if it exceeds MAX_URL_LENGTH and format the size once, on arrival
+                url_display = f"{url[:MAX_URL_LENGTH]}..." if len(url) > MAX_URL_LENGTH else url
+                # Add the new URL at the top; the deque's maxlen drops the one scrolling off the bottom
+                url_positions.appendleft((url_display, format_size(size)))
             
             # Update the physics simulation with substeps for better accuracy
-            dt = 1.0 / FPS / SUBSTEPS
             for _ in range(SUBSTEPS):
-                self.space.step(dt)
+                step(PHYSICS_DT)
             
-            # Remove balls that exit through the funnel's bottom opening or are too old
-            current_time = time.time()
-            for ball in self.balls[:]:
-                pos = ball.body.position
-                # Check if the ball exits through the funnel
-                if (pos.y > SCREEN_HEIGHT and 
-                    FUNNEL_OPENING_LEFT <= pos.x <= FUNNEL_OPENING_RIGHT):
-                    if ball.method == 'POST':
-                        self.space.remove(ball.arrow_shape, ball.body)
-                    elif ball.method == 'DELETE':
-                        self.space.remove(ball.shape1, ball.shape2, ball.body)
-                    else:
-                        self.space.remove(ball.shape, ball.body)
-                    self.balls.remove(ball)
-                # Despawn balls that have been on screen for more than DESPAWN_TIME seconds
-                elif (current_time - ball.spawn_time) > DESPAWN_TIME:
-                    if ball.method == 'POST':
-                        self.space.remove(ball.arrow_shape, ball.body)
-                    elif ball.method == 'DELETE':
-                        self.space.remove(ball.shape1, ball.shape2, ball.body)
-                    else:
-                        self.space.remove(ball.shape, ball.body)
-                    self.balls.remove(ball)
-            
-            # Clear the screen
-            self.screen.fill(self.black)
+            # Clear the physics area only; the info panel background below covers the rest
+            screen.fill(self.black, self.main_area_rect)
             
             # Draw the funnel walls
-            self.draw_shape(self.left_wall, self.white)
-            self.draw_shape(self.right_wall, self.white)
-            
-            # Draw all balls
-            for ball in self.balls:
-                if ball.method == 'POST':
-                    self.draw_shape(ball.arrow_shape, ball.color)
-                elif ball.method == 'DELETE':
-                    self.draw_shape(ball.shape1, ball.color)
-                    self.draw_shape(ball.shape2, ball.color)
-                else:
-                    self.draw_shape(ball.shape, ball.color)
+            draw_shape(self.left_wall, white)
+            draw_shape(self.right_wall, white)
             
-            # Draw status text on each ball
-            for ball in self.balls:
-                pos = ball.body.position
-                text_surface = self.font.render(str(ball.status), True, self.white)
-                # Center the status text on the ball
-                self.screen.blit(text_surface, (int(pos.x - text_surface.get_width() // 2), int(pos.y - text_surface.get_height() // 2)))
+            # Remove balls that exit through the funnel's bottom opening or are too old, and draw
+            # the others with their status text, in a single pass that rebuilds the list of survivors
+            survivors = []
+            to_remove = []
+            for ball in balls:
+                x, y = ball.body.position
+                # Check if the ball exits through the funnel or has been on screen for more than DESPAWN_TIME seconds
+                if ((y > SCREEN_HEIGHT and FUNNEL_OPENING_LEFT <= x <= FUNNEL_OPENING_RIGHT)
+                        or now > ball.despawn_at):
+                    to_remove.append(ball.body)
+                    to_remove.extend(ball.shapes)
+                    continue
+                survivors.append(ball)
+                
+                for shape in ball.shapes:
+                    draw_shape(shape, ball.color)
+                # Center the status text on the ball, skipping balls that have left the screen vertically
+                if 0 <= y <= SCREEN_HEIGHT:
+                    blit(ball.status_surface, (int(x - ball.status_half_width), int(y - ball.status_half_height)))
+            self.balls = survivors
+            # Remove the bodies and shapes of all despawned balls from the space in one call
+            if to_remove:
+                space.remove(*to_remove)
             
             # Draw the info panel background
-            pygame.draw.rect(self.screen, (50, 50, 50), (MAIN_AREA_WIDTH, 0, INFO_PANEL_WIDTH, SCREEN_HEIGHT))
+            pygame.draw.rect(screen, (50, 50, 50), (MAIN_AREA_WIDTH, 0, INFO_PANEL_WIDTH, SCREEN_HEIGHT))
             
             # Draw URLs and sizes with a fading effect near the stats area
-            for url, size, y_pos in self.url_positions:
-                if y_pos < SCROLL_AREA_HEIGHT:
-                    alpha = 255
-                    if y_pos >= FADE_START_Y:
-                        # Calculate fading: linearly reduce alpha from 255 to 0 between FADE_START_Y and FADE_END_Y
-                        fade_distance = FADE_END_Y - FADE_START_Y
-                        distance_from_fade_start = y_pos - FADE_START_Y
-                        alpha = int(255 * (1 - (distance_from_fade_start / fade_distance)))
-                        alpha = max(0, min(255, alpha))
-                    
-                    # Truncate the URL if it exceeds MAX_URL_LENGTH
-                    url_display = f"{url[:MAX_URL_LENGTH]}..." if len(url) > MAX_URL_LENGTH else url
-                    url_text = self.font.render(url_display, True, self.white)
-                    size_str = format_size(size)
-                    size_text = self.font.render(size_str, True, self.prasin_green)
-                    
-                    # Apply the fading effect to both URL and size text
-                    url_text.set_alpha(alpha)
-                    size_text.set_alpha(alpha)
-                    
-                    # Draw the URL on the left and the size on the right
-                    self.screen.blit(url_text, (MAIN_AREA_WIDTH + 10, int(y_pos)))
-                    self.screen.blit(size_text, (MAIN_AREA_WIDTH + INFO_PANEL_WIDTH - size_text.get_width() - 10, int(y_pos)))
+            for i, (url_display, size_str) in enumerate(url_positions):
+                y_pos = 20 + i * MIN_LINE_SPACING
+                alpha = row_alpha[i]
+                
+                url_text = render_text(url_display, white)
+                size_text = render_text(size_str, self.prasin_green)
+                
+                # Apply the fading effect to both URL and size text (the cached surfaces
+                # are shared, so the alpha is set again before every blit)
+                url_text.set_alpha(alpha)
+                size_text.set_alpha(alpha)
+                
+                # Draw the URL on the left and the size on the right
+                blit(url_text, (MAIN_AREA_WIDTH + 10, y_pos))
+                blit(size_text, (MAIN_AREA_WIDTH + INFO_PANEL_WIDTH - size_text.get_width() - 10, y_pos))
             
             # Display stats at the bottom of the info panel
             y_offset = SCREEN_HEIGHT - 100
             # Calculate request rates (requests per minute and per second)
-            current_time = time.time()
-            request_times_copy = list(self.request_times)  # Create a copy to avoid mutation during iteration
-            requests_per_min = sum(1 for t in request_times_copy if current_time - t < 60)
-            requests_per_sec = sum(1 for t in request_times_copy if current_time - t < 1)
+            # Timestamps are appended in order, so binary search finds the cutoffs
+            idx_min = bisect_right(request_times, now - 60)
+            # Drop timestamps older than a minute; the log thread only appends, so this is safe
+            del request_times[:idx_min]
+            total = len(request_times)
+            requests_per_min = total
+            requests_per_sec = total - bisect_right(request_times, now - 1, 0, total)
             
             stats = [
                 f"Max Size: {format_size(self.max_size_seen)}",
@@ -412,8 +460,8 @@ class LogVisualizer:
             
             # Draw each stat line
             for stat in stats:
-                text = self.font.render(stat, True, self.white)
-                self.screen.blit(text, (MAIN_AREA_WIDTH + 10, y_offset))
+                text = render_text(stat, white)
+                blit(text, (MAIN_AREA_WIDTH + 10, y_offset))
                 y_offset += 20
             
             # Update the display